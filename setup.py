@@ -23,5 +23,6 @@ setup(
         "psycopg2==2.5.3",
         "factory-boy==2.4.1",
         "django-bootstrap-form==3.1",
+        "celery==3.1.13",
     ],
 )
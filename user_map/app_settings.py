@@ -46,3 +46,25 @@ default_leaflet_tiles = (
 )
 LEAFLET_TILES = getattr(settings, 'LEAFLET_TILES', default_leaflet_tiles)
 
+
+# USERS CACHE TIMEOUT: Seconds the users json of a role is kept in the cache.
+default_users_cache_timeout = 60
+USERS_CACHE_TIMEOUT = getattr(
+    settings, 'USER_MAP_USERS_CACHE_TIMEOUT', default_users_cache_timeout)
+
+# INDEX CACHE MAX AGE: Seconds a shared cache may serve the anonymous map page.
+default_index_cache_max_age = 300
+INDEX_CACHE_MAX_AGE = getattr(
+    settings, 'USER_MAP_INDEX_CACHE_MAX_AGE', default_index_cache_max_age)
+
+# LOGIN ATTEMPTS: Failed logins allowed for an email from an IP address within
+# the timeout (in seconds) before the login form stops checking the password
+# of that email from that address.
+default_login_attempts_limit = 5
+LOGIN_ATTEMPTS_LIMIT = getattr(
+    settings, 'USER_MAP_LOGIN_ATTEMPTS_LIMIT', default_login_attempts_limit)
+default_login_attempts_timeout = 300
+LOGIN_ATTEMPTS_TIMEOUT = getattr(
+    settings,
+    'USER_MAP_LOGIN_ATTEMPTS_TIMEOUT',
+    default_login_attempts_timeout)
@@ -1,15 +1,38 @@
 # coding=utf-8
 """Django Forms for Login."""
+import hashlib
+
 from django import forms
+from django.contrib.auth import authenticate
+from django.contrib.auth.forms import AuthenticationForm
+from django.core.cache import cache
+
+from user_map.app_settings import LOGIN_ATTEMPTS_LIMIT, LOGIN_ATTEMPTS_TIMEOUT
+
 
+class LoginForm(AuthenticationForm):
+    """Form for user to log in.
 
-class LoginForm(forms.Form):
-    """Form for user to log in."""
-    class Meta:
-        """Meta of the form."""
-        fields = ['email', 'password']
+    The user is authenticated once while the form is cleaned, so the view
+    only needs to take it from get_user(). Failed attempts are counted per IP
+    address and email, and once LOGIN_ATTEMPTS_LIMIT is reached the password
+    of that email is not checked at all from that address until
+    LOGIN_ATTEMPTS_TIMEOUT has passed.
+    """
+    error_messages = {
+        'invalid_login': (
+            'Please enter a correct email and password. '
+            'Note that both fields may be case-sensitive.'),
+        'inactive': (
+            'The user is not active. Please contact our '
+            'administrator to resolve this.'),
+        'unconfirmed': 'Please confirm you registration email first!',
+        'too_many_attempts': (
+            'Too many failed login attempts. Please try again later.'),
+    }
 
-    email = forms.EmailField(
+    username = forms.EmailField(
+        label='Email',
         widget=forms.EmailInput(
             attrs={
                 'class': 'form-control',
@@ -24,3 +47,72 @@ class LoginForm(forms.Form):
             })
     )
 
+    def clean(self):
+        """Authenticate the user with the entered email and password."""
+        email = self.cleaned_data.get('username')
+        password = self.cleaned_data.get('password')
+
+        if email and password:
+            attempts_key = self.attempts_cache_key(email)
+            if (attempts_key is not None and
+                    cache.get(attempts_key, 0) >= LOGIN_ATTEMPTS_LIMIT):
+                raise forms.ValidationError(
+                    self.error_messages['too_many_attempts'],
+                    code='too_many_attempts')
+
+            self.user_cache = authenticate(email=email, password=password)
+            if self.user_cache is None:
+                if attempts_key is not None:
+                    self.count_failed_attempt(attempts_key)
+                raise forms.ValidationError(
+                    self.error_messages['invalid_login'],
+                    code='invalid_login')
+            if attempts_key is not None:
+                # The password is right, so earlier typos don't count anymore.
+                cache.delete(attempts_key)
+            if not self.user_cache.is_active:
+                raise forms.ValidationError(
+                    self.error_messages['inactive'],
+                    code='inactive')
+            if not self.user_cache.is_confirmed:
+                raise forms.ValidationError(
+                    self.error_messages['unconfirmed'],
+                    code='unconfirmed')
+        return self.cleaned_data
+
+    def attempts_cache_key(self, email):
+        """Return the cache key counting failed logins of the client.
+
+        The email is part of the key, so clients sharing an address (e.g.
+        behind a proxy) can't lock each other out, while the password checks
+        of an account from one address are still limited.
+
+        :param email: The entered email.
+        :type email: str
+
+        :return: The cache key, or None if the form has no request.
+        :rtype: str
+        """
+        if self.request is None:
+            return None
+        # Hash the email, as it could make the key too long or invalid.
+        email_hash = hashlib.md5(email.lower().encode('utf-8')).hexdigest()
+        return 'user_map:login_attempts:%s:%s' % (
+            self.request.META.get('REMOTE_ADDR', ''), email_hash)
+
+    @staticmethod
+    def count_failed_attempt(attempts_key):
+        """Count a failed login of the client.
+
+        The timeout starts at the first failure and isn't extended by the
+        next ones.
+
+        :param attempts_key: The cache key counting failed logins.
+        :type attempts_key: str
+        """
+        if not cache.add(attempts_key, 1, LOGIN_ATTEMPTS_TIMEOUT):
+            try:
+                cache.incr(attempts_key)
+            except ValueError:
+                # It expired since add(), so start a new window.
+                cache.set(attempts_key, 1, LOGIN_ATTEMPTS_TIMEOUT)
@@ -2,10 +2,13 @@
 """Model class of custom user for InaSAFE User Map."""
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.gis.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.crypto import get_random_string
 
 from user_map.models.user_manager import CustomUserManager
 from user_map.models.role import Role
+from user_map.utilities.users_cache import invalidate_users_cache
 
 
 class User(AbstractBaseUser):
@@ -13,6 +16,8 @@ class User(AbstractBaseUser):
     class Meta:
         """Meta class."""
         app_label = 'user_map'
+        # Matches the filter of the users shown on the map.
+        index_together = [['role', 'is_confirmed', 'is_active']]
 
     name = models.CharField(
         help_text='Your name.',
@@ -120,4 +125,28 @@ class User(AbstractBaseUser):
         if not self.pk:
             # New object here
             self.key = get_random_string()
-        super(User, self).save()
+        super(User, self).save(*args, **kwargs)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_users_cache(sender, instance, **kwargs):
+    """Clear the cached users json when a user is saved or deleted.
+
+    Some saves can't change the map, so the cache is kept for them:
+    creating an unconfirmed user (i.e. registering, the user is only shown
+    once confirmed) and saving only the last login time (on every log in).
+
+    :param sender: The model class of the user.
+    :type sender: User
+
+    :param instance: The saved or deleted user.
+    :type instance: User
+    """
+    if kwargs.get('created') and not instance.is_confirmed:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_users_cache()
@@ -0,0 +1,46 @@
+# coding=utf-8
+"""Celery tasks of the apps."""
+from celery import shared_task
+from django.core.mail import send_mail
+from django.template import loader
+from django.utils.http import urlsafe_base64_encode
+from django.utils.encoding import force_bytes
+
+from user_map.models import User
+from user_map.app_settings import PROJECT_NAME, DEFAULT_FROM_MAIL
+
+
+@shared_task
+def send_registration_email(user_pk, domain, site_name):
+    """Send the registration confirmation email to a user.
+
+    :param user_pk: The primary key of the registered user.
+    :type user_pk: int
+
+    :param domain: The domain of the current site.
+    :type domain: str
+
+    :param site_name: The name of the current site.
+    :type site_name: str
+    """
+    user = User.objects.get(pk=user_pk)
+    context = {
+        'project_name': PROJECT_NAME,
+        'protocol': 'http',
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'key': user.key
+    }
+    email = loader.render_to_string(
+        'user_map/account/registration_confirmation_email.html',
+        context)
+
+    subject = '%s User Registration' % PROJECT_NAME
+    sender = '%s - No Reply <%s>' % (PROJECT_NAME, DEFAULT_FROM_MAIL)
+    send_mail(
+        subject,
+        email,
+        sender,
+        [user.email], fail_silently=False)
@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Module related to test for all the forms."""
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from user_map.app_settings import LOGIN_ATTEMPTS_LIMIT
+from user_map.forms import LoginForm
+from user_map.tests.model_factories import UserFactory
+
+
+class TestLoginForm(TestCase):
+    """Class to test LoginForm."""
+    def setUp(self):
+        self.request = RequestFactory().post('/login')
+        self.user = UserFactory.create(is_confirmed=True)
+        self.user.set_password('password')
+        self.user.save()
+        cache.clear()
+
+    def login_form(self, password):
+        """Create a bound login form for the user.
+
+        :param password: The entered password.
+        :type password: str
+        """
+        return LoginForm(
+            self.request,
+            data={'username': self.user.email, 'password': password})
+
+    def test_login(self):
+        """Method to test logging in with the right password."""
+        form = self.login_form('password')
+        message = 'The form should be valid, but it gives %s' % form.errors
+        self.assertTrue(form.is_valid(), message)
+        self.assertEqual(form.get_user(), self.user)
+
+    def test_login_too_many_attempts(self):
+        """Method to test that failed attempts are limited."""
+        for _ in range(LOGIN_ATTEMPTS_LIMIT):
+            self.assertFalse(self.login_form('wrong').is_valid())
+
+        form = self.login_form('password')
+        message = 'The form should be invalid after too many attempts.'
+        self.assertFalse(form.is_valid(), message)
+        self.assertIsNone(form.get_user())
+
+    def test_login_resets_attempts(self):
+        """Method to test that logging in clears the failed attempts."""
+        for _ in range(LOGIN_ATTEMPTS_LIMIT - 1):
+            self.assertFalse(self.login_form('wrong').is_valid())
+        self.assertTrue(self.login_form('password').is_valid())
+
+        self.assertFalse(self.login_form('wrong').is_valid())
+        form = self.login_form('password')
+        message = 'One typo after logging in should not block the user.'
+        self.assertTrue(form.is_valid(), message)
+
+    def test_login_attempts_per_email(self):
+        """Method to test that failed attempts don't block other users."""
+        other_user = UserFactory.create(is_confirmed=True)
+        other_user.set_password('password')
+        other_user.save()
+        for _ in range(LOGIN_ATTEMPTS_LIMIT):
+            self.assertFalse(self.login_form('wrong').is_valid())
+
+        form = LoginForm(
+            self.request,
+            data={'username': other_user.email, 'password': 'password'})
+        message = 'The other user should still be able to log in.'
+        self.assertTrue(form.is_valid(), message)
+        self.assertEqual(form.get_user(), other_user)
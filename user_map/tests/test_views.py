@@ -0,0 +1,178 @@
+# coding=utf-8
+"""Module related to test for all the views."""
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.test.client import RequestFactory
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from user_map.tests.model_factories import RoleFactory, UserFactory
+from user_map.models import User
+from user_map.views import get_users, confirm_registration
+
+
+class TestGetUsers(TestCase):
+    """Class to test get_users view."""
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.role = RoleFactory.create()
+        cache.clear()
+
+    def get_users(self):
+        """Call get_users for the role and return the decoded users.
+
+        :returns: The GeoJSON feature collection of the users.
+        :rtype: dict
+        """
+        request = self.factory.get('/users.json', {'user_role': self.role.id})
+        response = get_users(request)
+        # Iterate the response, as it is streamed when it isn't cached.
+        return json.loads(''.join(response))['users']
+
+    def test_get_users_query_count(self):
+        """Method to test that the query count does not grow with users."""
+        UserFactory.create(role=self.role, is_confirmed=True)
+        with self.assertNumQueries(1):
+            self.get_users()
+
+        cache.clear()
+        UserFactory.create_batch(5, role=self.role, is_confirmed=True)
+        with self.assertNumQueries(1):
+            users = self.get_users()
+        message = 'There should be 6 users, but it gives %s' % len(
+            users['features'])
+        self.assertEqual(len(users['features']), 6, message)
+
+    def test_get_users_cached(self):
+        """Method to test that the users json is cached after a call."""
+        UserFactory.create(role=self.role, is_confirmed=True)
+        users = self.get_users()
+        with self.assertNumQueries(0):
+            cached_users = self.get_users()
+        message = 'The cached users should be the same as the streamed ones.'
+        self.assertEqual(users, cached_users, message)
+
+    def test_get_users_cache_cleared(self):
+        """Method to test that changing a user clears the cached json."""
+        user = UserFactory.create(role=self.role, is_confirmed=True)
+        self.get_users()
+
+        user.is_active = False
+        user.save()
+        users = self.get_users()
+        message = 'There should be no user, but it gives %s' % len(
+            users['features'])
+        self.assertEqual(len(users['features']), 0, message)
+
+    def test_get_users_cache_kept_on_register(self):
+        """Method to test that a new unconfirmed user keeps the cache."""
+        UserFactory.create(role=self.role, is_confirmed=True)
+        self.get_users()
+
+        UserFactory.create(role=self.role, is_confirmed=False)
+        with self.assertNumQueries(0):
+            self.get_users()
+
+    def test_get_users_stale_stream(self):
+        """Method to test that a stream read before a change isn't cached."""
+        UserFactory.create(role=self.role, is_confirmed=True)
+        request = self.factory.get('/users.json', {'user_role': self.role.id})
+        chunks = iter(get_users(request))
+        # Read the header and the first user, so the users are fetched.
+        next(chunks)
+        next(chunks)
+
+        UserFactory.create(role=self.role, is_confirmed=True)
+        list(chunks)
+        users = self.get_users()
+        message = 'There should be 2 users, but it gives %s' % len(
+            users['features'])
+        self.assertEqual(len(users['features']), 2, message)
+
+    def test_get_users_only_confirmed(self):
+        """Method to test that only confirmed users are returned."""
+        UserFactory.create(role=self.role, is_confirmed=True)
+        UserFactory.create(role=self.role, is_confirmed=False)
+        users = self.get_users()
+        message = 'There should be 1 user, but it gives %s' % len(
+            users['features'])
+        self.assertEqual(len(users['features']), 1, message)
+
+
+class TestConfirmRegistration(TestCase):
+    """Class to test confirm_registration view."""
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = UserFactory.create(is_confirmed=False)
+        self.uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+
+    def confirm(self, key):
+        """Call confirm_registration for the user with the given key.
+
+        :param key: The confirmation key.
+        :type key: str
+        """
+        request = self.factory.get('/account-confirmation/')
+        request.user = AnonymousUser()
+        return confirm_registration(request, self.uid, key)
+
+    def test_confirm_registration(self):
+        """Method to test confirming with the right key."""
+        self.confirm(self.user.key)
+        user = User.objects.get(pk=self.user.pk)
+        message = 'The user should be confirmed.'
+        self.assertTrue(user.is_confirmed, message)
+
+    def test_confirm_registration_wrong_key(self):
+        """Method to test confirming with a wrong key."""
+        self.confirm('wrong-key')
+        user = User.objects.get(pk=self.user.pk)
+        message = 'The user should not be confirmed.'
+        self.assertFalse(user.is_confirmed, message)
+
+
+@override_settings(ROOT_URLCONF='user_map.tests.urls')
+class TestLogin(TestCase):
+    """Class to test login view."""
+    def setUp(self):
+        self.user = UserFactory.create(is_confirmed=True)
+        self.user.set_password('password')
+        self.user.save()
+        cache.clear()
+
+    def login(self, query=''):
+        """Log the user in and return the redirect location.
+
+        :param query: The query string of the login URL.
+        :type query: str
+
+        :returns: The URL the user is redirected to.
+        :rtype: str
+        """
+        response = self.client.post(
+            '/user-map/login' + query,
+            {'username': self.user.email, 'password': 'password'})
+        self.assertEqual(response.status_code, 302)
+        return response['Location']
+
+    def test_login_no_next(self):
+        """Method to test redirecting to the map without next page."""
+        self.assertTrue(self.login().endswith('/user-map/'))
+
+    def test_login_empty_next(self):
+        """Method to test redirecting to the map with an empty next page."""
+        self.assertTrue(self.login('?next=').endswith('/user-map/'))
+
+    def test_login_unsafe_next(self):
+        """Method to test redirecting to the map with an off-site next."""
+        location = self.login('?next=http://other-host/')
+        self.assertTrue(location.endswith('/user-map/'), location)
+
+    def test_login_next(self):
+        """Method to test redirecting to a safe next page."""
+        location = self.login('?next=/user-map/update-profile')
+        self.assertTrue(location.endswith('/user-map/update-profile'))
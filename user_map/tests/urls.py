@@ -0,0 +1,8 @@
+# coding=utf-8
+"""URI Routing configuration for the tests."""
+from django.conf.urls import patterns, url, include
+
+urlpatterns = patterns(
+    '',
+    url(r'^user-map/', include('user_map.urls', namespace='user_map')),
+)
@@ -1,6 +1,17 @@
 # coding=utf-8
 """URI Routing configuration for this apps."""
 from django.conf.urls import patterns, url
+from django.contrib.auth.views import (
+    logout,
+    password_reset,
+    password_reset_done,
+    password_reset_confirm,
+    password_reset_complete)
+
+from user_map.forms import (
+    CustomPasswordResetForm,
+    CustomSetPasswordForm)
+from user_map.utilities.decorators import login_forbidden
 
 urlpatterns = patterns(
     '',
@@ -13,16 +24,32 @@ urlpatterns = patterns(
         name='confirm_registration'),
 
     url(r'^login$', 'user_map.views.login', name='login'),
-    url(r'^logout$', 'user_map.views.logout', name='logout'),
+    url(r'^logout$', logout, {'next_page': 'user_map:index'},
+        name='logout'),
     url(r'^update-profile$', 'user_map.views.update_user', name='update_user'),
 
-    url(r'^password-reset/$', 'user_map.views.password_reset',
+    url(r'^password-reset/$', login_forbidden(password_reset),
+        {
+            'password_reset_form': CustomPasswordResetForm,
+            'template_name': 'user_map/account/password_reset_form.html',
+            'email_template_name':
+                'user_map/account/password_reset_email.html',
+            'post_reset_redirect': 'user_map:password_reset_done'
+        },
         name='password_reset'),
-    url(r'^password-reset/done/$', 'user_map.views.password_reset_done',
+    url(r'^password-reset/done/$', login_forbidden(password_reset_done),
+        {'template_name': 'user_map/account/password_reset_done.html'},
         name='password_reset_done'),
     url(r'^password-reset/confirm/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>.+)/$',
-        'user_map.views.password_reset_confirm', name='password_reset_confirm'),
+        login_forbidden(password_reset_confirm),
+        {
+            'template_name': 'user_map/account/password_reset_confirm.html',
+            'set_password_form': CustomSetPasswordForm,
+            'post_reset_redirect': 'user_map:password_reset_complete'
+        },
+        name='password_reset_confirm'),
     url(r'^password-reset/complete/$',
-        'user_map.views.password_reset_complete',
-    name='password_reset_complete')
+        login_forbidden(password_reset_complete),
+        {'template_name': 'user_map/account/password_reset_complete.html'},
+        name='password_reset_complete')
 )
@@ -0,0 +1,58 @@
+# coding=utf-8
+"""Module for the cache of the users json shown on the map.
+
+The cache keys contain a generation number. Invalidating the cache only
+bumps the generation, so a response that was generated from rows read
+before the invalidation is cached under the old generation and is never
+served again.
+"""
+import time
+
+from django.core.cache import cache
+
+USERS_CACHE_GENERATION_KEY = 'user_map:users:generation'
+
+
+def users_cache_generation():
+    """Return the current generation of the users cache.
+
+    :returns: The generation number.
+    :rtype: int
+    """
+    generation = cache.get(USERS_CACHE_GENERATION_KEY)
+    if generation is None:
+        # Start from the clock, so a generation that was evicted from the
+        # cache doesn't restart at a number that was already used.
+        generation = int(time.time() * 1000)
+        if not cache.add(USERS_CACHE_GENERATION_KEY, generation, None):
+            generation = cache.get(USERS_CACHE_GENERATION_KEY, generation)
+    return generation
+
+
+def users_cache_key(user_role, generation):
+    """Return the cache key of the users json for a role.
+
+    :param user_role: The id of the role.
+    :type user_role: int
+
+    :param generation: The generation of the users cache.
+    :type generation: int
+
+    :returns: The cache key.
+    :rtype: str
+    """
+    return 'user_map:users:%s:%s' % (generation, user_role)
+
+
+def invalidate_users_cache():
+    """Invalidate the cached users json of all roles.
+
+    This is called whenever a user is saved or deleted, so any change that
+    could show on the map (e.g. confirming the registration, banning a user
+    in admin or moving them to another role) is visible at once.
+    """
+    try:
+        cache.incr(USERS_CACHE_GENERATION_KEY)
+    except ValueError:
+        # There is no generation yet, so nothing has been cached under it.
+        pass
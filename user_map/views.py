@@ -1,79 +1,130 @@
 # coding=utf-8
 """Views of the apps."""
-from django.shortcuts import render, render_to_response
-from django.http import HttpResponse, HttpResponseRedirect
-from django.template import RequestContext, loader, Context
-from django.forms.util import ErrorList
-from django.forms.forms import NON_FIELD_ERRORS
+import json
+
+from django.shortcuts import render
+from django.http import (
+    HttpResponse, HttpResponseRedirect, StreamingHttpResponse)
+from django.template import loader
 from django.core.urlresolvers import reverse
-from django.core.mail import send_mail
+from django.core.cache import cache
 from django.contrib import messages
 from django.contrib.auth import (
-    login as django_login,
-    authenticate,
-    logout as django_logout)
-from django.contrib.auth.views import (
-    password_reset as django_password_reset,
-    password_reset_done as django_password_reset_done,
-    password_reset_confirm as django_password_reset_confirm,
-    password_reset_complete as django_password_reset_complete)
+    REDIRECT_FIELD_NAME,
+    login as django_login)
 from django.contrib.auth.decorators import login_required
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, is_safe_url
+from django.utils.html import format_html
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.contrib.sites.models import get_current_site
 
 from user_map.forms import (
     UserForm,
     LoginForm,
     BasicInformationForm,
-    PasswordForm,
-    CustomPasswordResetForm,
-    CustomSetPasswordForm)
+    PasswordForm)
 from user_map.models import User
+from user_map.tasks import send_registration_email
 from user_map.app_settings import (
-    PROJECT_NAME, USER_ICONS, DEFAULT_FROM_MAIL, LEAFLET_TILES)
+    USER_ICONS,
+    LEAFLET_TILES,
+    USERS_CACHE_TIMEOUT,
+    INDEX_CACHE_MAX_AGE)
 from user_map.utilities.decorators import login_forbidden
+from user_map.utilities.users_cache import (
+    users_cache_key, users_cache_generation, invalidate_users_cache)
+
+_LEAFLET_TILES = dict(
+    url=LEAFLET_TILES[1],
+    attribution=LEAFLET_TILES[2]
+)
+
+_USER_MENU = dict(
+    add_user=True,
+    download=True,
+    reminder=True
+)
+
+# The fragments of index do not depend on the request, so they are all
+# rendered in one pass when the module is loaded instead of on every hit.
+# Context variable of index -> (template, context) of the fragment.
+_INDEX_FRAGMENT_TEMPLATES = {
+    'information_modal': ('user_map/information_modal.html', {}),
+    'data_privacy_content': ('user_map/data_privacy.html', {}),
+    'user_menu_button': ('user_map/user_menu_button.html', _USER_MENU),
+    'legend': ('user_map/legend.html', {'user_icons': USER_ICONS}),
+}
+_INDEX_FRAGMENTS = dict(
+    (name, loader.render_to_string(template_name, dictionary=dictionary))
+    for name, (template_name, dictionary) in
+    _INDEX_FRAGMENT_TEMPLATES.items())
+
+# Markup of the popup of a user on the map. It is formatted for every user in
+# get_users, so plain format strings are used instead of a template.
+_USER_POPUP_NAME_HTML = (
+    u"<span class='glyphicon glyphicon-user'></span> {0}<br>")
+_USER_POPUP_WEBSITE_HTML = (
+    u"<span class='glyphicon glyphicon-home'></span>"
+    u"<a href='{0}' target='_blank'> Website</a>")
+
+# Only these columns are needed to build the features of the users map.
+_USER_MAP_FIELDS = ('name', 'website', 'location')
+
+# URL name -> path, filled by _url.
+_URLS = {}
+
+
+def _url(name):
+    """Reverse a URL name without arguments, reusing the previous result.
+
+    The URL patterns of the apps don't change once they are loaded, so each
+    name is only resolved once per process.
+
+    :param name: The name of the URL pattern e.g. 'user_map:index'.
+    :type name: str
+
+    :returns: The path of the URL.
+    :rtype: str
+    """
+    try:
+        return _URLS[name]
+    except KeyError:
+        _URLS[name] = url = reverse(name)
+        return url
 
 
 def index(request):
     """Index page of user map.
 
+    The page is the same for every anonymous user, so shared caches (e.g.
+    Nginx or a CDN) are allowed to serve it for INDEX_CACHE_MAX_AGE seconds.
+    The navigation bar of a logged in user is personal, so it is never
+    stored in a shared cache.
+
     :param request: A django request object.
     :type request: request
 
     :returns: Response will be a nice looking map page.
     :rtype: HttpResponse
     """
-    information_modal = loader.render_to_string(
-        'user_map/information_modal.html')
-    data_privacy_content = loader.render_to_string('user_map/data_privacy.html')
-    user_menu = dict(
-        add_user=True,
-        download=True,
-        reminder=True
-    )
-    user_menu_button = loader.render_to_string(
-        'user_map/user_menu_button.html',
-        dictionary=user_menu
+    context = dict(
+        _INDEX_FRAGMENTS,
+        user_menu=_USER_MENU,
+        user_icons=USER_ICONS,
+        leaflet_tiles=_LEAFLET_TILES
     )
-    legend_template = loader.get_template('user_map/legend.html')
-    legend_context = Context({'user_icons': USER_ICONS})
-    legend = legend_template.render(legend_context)
-
-    leaflet_tiles = dict(
-        url=LEAFLET_TILES[1],
-        attribution=LEAFLET_TILES[2]
-    )
-    context = {
-        'data_privacy_content': data_privacy_content,
-        'information_modal': information_modal,
-        'user_menu': user_menu,
-        'user_menu_button': user_menu_button,
-        'user_icons': USER_ICONS,
-        'legend': legend,
-        'leaflet_tiles': leaflet_tiles
-    }
-    return render(request, 'user_map/index.html', context)
+    response = render(request, 'user_map/index.html', context)
+    patch_vary_headers(response, ['Cookie'])
+    if request.user.is_authenticated():
+        patch_cache_control(response, private=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=INDEX_CACHE_MAX_AGE,
+            stale_while_revalidate=60)
+    return response
 
 
 def get_users(request):
@@ -87,22 +138,97 @@ def get_users(request):
     # Get data:
     user_role = int(request.GET['user_role'])
 
+    # The generation is read before the users, so if the cache is
+    # invalidated while they are streamed the stale json is not served.
+    cache_key = users_cache_key(user_role, users_cache_generation())
+    users_json = cache.get(cache_key)
+    if users_json is not None:
+        return HttpResponse(users_json, content_type='application/json')
+
+    # Not cached: stream the users while they are fetched and cache the
+    # document once it is complete.
+    return StreamingHttpResponse(
+        _cache_users_json(cache_key, _users_json_chunks(user_role)),
+        content_type='application/json')
+
+
+def _users_json_chunks(user_role):
+    """Serialise the confirmed and active users with given role to json.
+
+    The document is yielded one user at a time, so the whole list never has
+    to be held in memory.
+
+    :param user_role: The id of the role.
+    :type user_role: int
+
+    :returns: Chunks of the users as a GeoJSON feature collection under
+        'users'.
+    :rtype: generator
+    """
     # Get user
     users = User.objects.filter(
         role=user_role,
         is_confirmed=True,
-        is_active=True)
-    json_users_template = loader.get_template('user_map/users.json')
-    context = Context({'users': users})
-    json_users = json_users_template.render(context)
-
-    users_json = (
-        '{'
-        ' "users": %s'
-        '}' % json_users
-    )
-    # Return Response
-    return HttpResponse(users_json, mimetype='application/json')
+        is_active=True).values(*_USER_MAP_FIELDS)
+
+    yield '{"users":{"type":"FeatureCollection","features":['
+    separator = ''
+    # The rows are used once, so don't keep them in the queryset cache.
+    for user in users.iterator():
+        # The json is only read by the map, so drop the whitespace separators.
+        yield separator + json.dumps(
+            _user_feature(user), separators=(',', ':'))
+        separator = ','
+    yield ']}}'
+
+
+def _cache_users_json(cache_key, chunks):
+    """Pass the json chunks through and cache the complete document.
+
+    Nothing is cached if the response is closed before the last chunk, and
+    an entry that another response cached meanwhile is kept.
+
+    :param cache_key: The cache key of the users json.
+    :type cache_key: str
+
+    :param chunks: The chunks of the users json.
+    :type chunks: generator
+
+    :returns: The same chunks.
+    :rtype: generator
+    """
+    users_json = []
+    for chunk in chunks:
+        users_json.append(chunk)
+        yield chunk
+    cache.add(cache_key, ''.join(users_json), USERS_CACHE_TIMEOUT)
+
+
+def _user_feature(user):
+    """Build a GeoJSON feature for a user to be shown on the map.
+
+    :param user: The values of _USER_MAP_FIELDS of a user.
+    :type user: dict
+
+    :returns: A GeoJSON point feature with the popup content of the user.
+    :rtype: dict
+    """
+    location = user['location']
+    popup_content = format_html(_USER_POPUP_NAME_HTML, user['name'])
+    if user['website'] != '':
+        popup_content += format_html(
+            _USER_POPUP_WEBSITE_HTML, user['website'])
+    return {
+        'type': 'Feature',
+        'properties': {
+            'name': user['name'],
+            'popupContent': popup_content
+        },
+        'geometry': {
+            'type': 'Point',
+            'coordinates': [location.x, location.y]
+        }
+    }
 
 
 @login_forbidden
@@ -118,40 +244,20 @@ def register(request):
             user = form.save()
 
             current_site = get_current_site(request)
-            site_name = current_site.name
-            domain = current_site.domain
-            context = {
-                'project_name': PROJECT_NAME,
-                'protocol': 'http',
-                'domain': domain,
-                'site_name': site_name,
-                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-                'user': user,
-                'key': user.key
-            }
-            email = loader.render_to_string(
-                'user_map/account/registration_confirmation_email.html',
-                context)
-
-            subject = '%s User Registration' % PROJECT_NAME
-            sender = '%s - No Reply <%s>' % (PROJECT_NAME, DEFAULT_FROM_MAIL)
-            send_mail(
-                subject,
-                email,
-                sender,
-                [user.email], fail_silently=False)
+            send_registration_email.delay(
+                user.pk, current_site.domain, current_site.name)
 
             messages.success(
                 request,
                 ('Thank you for registering in our site! Please check your '
                  'email to confirm your registration'))
-            return HttpResponseRedirect(reverse('user_map:register'))
+            return HttpResponseRedirect(_url('user_map:register'))
     else:
         form = UserForm()
-    return render_to_response(
+    return render(
+        request,
         'user_map/account/registration.html',
-        {'form': form},
-        context_instance=RequestContext(request)
+        {'form': form}
     )
 
 
@@ -168,85 +274,61 @@ def confirm_registration(request, uid, key):
     :param key: Key to confirm the user.
     :type key: str
     """
-    decoded_uid = urlsafe_base64_decode(uid)
+    invalid_information = (
+        'Your link is not valid. Please make sure that you use '
+        'confirmation link we sent to your email.')
     try:
-        user = User.objects.get(pk=decoded_uid)
-
-        if not user.is_confirmed:
-            if user.key == key:
-                user.is_confirmed = True
-                user.save(update_fields=['is_confirmed'])
-                information = (
-                    'Congratulations! Your account has been successfully '
-                    'confirmed. Please continue to log in.')
-            else:
-                information = (
-                    'Your link is not valid. Please make sure that you use '
-                    'confirmation link we sent to your email.')
-        else:
+        decoded_uid = urlsafe_base64_decode(uid)
+        user_key, is_confirmed = User.objects.values_list(
+            'key', 'is_confirmed').get(pk=decoded_uid)
+
+        if is_confirmed:
             information = ('Your account is already confirmed. Please '
                            'continue to log in.')
+        elif constant_time_compare(user_key, key):
+            # Only confirm if it's not, so a second click can't do it twice
+            User.objects.filter(
+                pk=decoded_uid,
+                is_confirmed=False).update(is_confirmed=True)
+            # update() doesn't send post_save, so clear the cache here.
+            invalidate_users_cache()
+            information = (
+                'Congratulations! Your account has been successfully '
+                'confirmed. Please continue to log in.')
+        else:
+            information = invalid_information
     except (TypeError, ValueError, OverflowError, User.DoesNotExist):
-        information = ('Your link is not valid. Please make sure that you use '
-                       'confirmation link we sent to your email.')
+        information = invalid_information
 
     context = {
         'page_header_title': 'Registration Confirmation',
         'information': information
     }
-    return render_to_response(
-        'user_map/information.html',
-        context,
-        context_instance=RequestContext(request)
-    )
+    return render(request, 'user_map/information.html', context)
 
 
 @login_forbidden
 def login(request):
     """Login view.
 
+    The user is authenticated by LoginForm. After logging in the user is sent
+    to the next page if it is given and safe, otherwise to the map (not to
+    LOGIN_REDIRECT_URL).
+
     :param request: A django request object.
     :type request: request
     """
     if request.method == 'POST':
-        next_page = request.GET.get('next', '')
-        if next_page == '':
-            next_page = reverse('user_map:index')
-        form = LoginForm(data=request.POST)
+        form = LoginForm(request, data=request.POST)
         if form.is_valid():
-            user = authenticate(
-                email=request.POST['email'],
-                password=request.POST['password']
-            )
-            if user is not None:
-                if user.is_active and user.is_confirmed:
-                    django_login(request, user)
-
-                    return HttpResponseRedirect(next_page)
-                if not user.is_active:
-                    errors = form._errors.setdefault(
-                        NON_FIELD_ERRORS, ErrorList())
-                    errors.append(
-                        'The user is not active. Please contact our '
-                        'administrator to resolve this.')
-                if not user.is_confirmed:
-                    errors = form._errors.setdefault(
-                        NON_FIELD_ERRORS, ErrorList())
-                    errors.append(
-                        'Please confirm you registration email first!')
-            else:
-                errors = form._errors.setdefault(
-                    NON_FIELD_ERRORS, ErrorList())
-                errors.append(
-                    'Please enter a correct email and password. '
-                    'Note that both fields may be case-sensitive.')
-
+            next_page = request.REQUEST.get(REDIRECT_FIELD_NAME, '')
+            if not is_safe_url(url=next_page, host=request.get_host()):
+                next_page = _url('user_map:index')
+            django_login(request, form.get_user())
+            return HttpResponseRedirect(next_page)
     else:
-        form = LoginForm()
-    return render_to_response(
-        'user_map/account/login.html',
-        {'form': form},
-        context_instance=RequestContext(request))
+        form = LoginForm(request)
+    return render(request, 'user_map/account/login.html', {'form': form})
 
 
 @login_required(login_url='user_map:login')
@@ -257,116 +339,41 @@ def update_user(request):
     :type request: request
     """
     anchor_id = '#basic-information'
+    basic_info_form = None
+    change_password_form = None
     if request.method == 'POST':
         if 'change_basic_info' in request.POST:
-            anchor_id = '#basic-information'
             basic_info_form = BasicInformationForm(
                 data=request.POST, instance=request.user)
-            change_password_form = PasswordForm(user=request.user)
             if basic_info_form.is_valid():
-                user = basic_info_form.save()
+                basic_info_form.save()
                 messages.success(
                     request, 'You have succesfully changed your information!')
                 return HttpResponseRedirect(
-                    reverse('user_map:update_user') + anchor_id)
-            else:
-                anchor_id = '#basic-information'
+                    _url('user_map:update_user') + anchor_id)
         elif 'change_password' in request.POST:
             anchor_id = '#security'
             change_password_form = PasswordForm(
                 data=request.POST, user=request.user)
-            basic_info_form = BasicInformationForm(instance=request.user)
             if change_password_form.is_valid():
-                user = change_password_form.save()
+                change_password_form.save()
                 messages.success(
                     request, 'You have successfully changed your password!')
                 return HttpResponseRedirect(
-                    reverse('user_map:update_user') + anchor_id)
-            else:
-                anchor_id = '#security'
+                    _url('user_map:update_user') + anchor_id)
 
-    else:
+    # Only the forms that were not submitted are left to build, unbound.
+    if basic_info_form is None:
         basic_info_form = BasicInformationForm(instance=request.user)
+    if change_password_form is None:
         change_password_form = PasswordForm(user=request.user)
 
-    return render_to_response(
+    return render(
+        request,
         'user_map/account/edit_user.html',
         {
             'basic_info_form': basic_info_form,
             'change_password_form': change_password_form,
             'anchor_id': anchor_id,
-        },
-        context_instance=RequestContext(request)
+        }
     )
-
-
-@login_forbidden
-def password_reset(request):
-    """The view for reset password that contains a form to ask for email.
-
-    :param request: A django request object.
-    :type request: request
-    """
-    return django_password_reset(
-        request,
-        password_reset_form=CustomPasswordResetForm,
-        template_name='user_map/account/password_reset_form.html',
-        email_template_name='user_map/account/password_reset_email.html',
-        post_reset_redirect=reverse('user_map:password_reset_done'))
-
-
-@login_forbidden
-def password_reset_done(request):
-    """The view telling the user that an email has been sent.
-
-    :param request: A django request object.
-    :type request: request
-    """
-    return django_password_reset_done(
-        request,
-        template_name='user_map/account/password_reset_done.html')
-
-
-@login_forbidden
-def password_reset_confirm(request, uidb64=None, token=None):
-    """The view containing form to reset password and process it.
-
-    :param request: A django request object.
-    :type request: request
-
-    :param uidb64: An unique ID of the user.
-    :type uidb64: str
-
-    :param token: Token to check if the reset password link is valid.
-    :type token: str
-    """
-    return django_password_reset_confirm(
-        request,
-        uidb64=uidb64,
-        token=token,
-        template_name='user_map/account/password_reset_confirm.html',
-        set_password_form=CustomSetPasswordForm,
-        post_reset_redirect=reverse('user_map:password_reset_complete'))
-
-
-@login_forbidden
-def password_reset_complete(request):
-    """The view telling the user that reset password process has been completed.
-
-    :param request: A django request object.
-    :type request: request
-    """
-    return django_password_reset_complete(
-        request,
-        template_name='user_map/account/password_reset_complete.html')
-
-
-def logout(request):
-    """Log out view.
-
-    :param request: A django request object.
-    :type request: request
-    """
-    django_logout(request)
-    return HttpResponseRedirect(reverse('user_map:index'))
-